@@ -1,4 +1,3 @@
-import requests
 import json
 import notion_client
 
@@ -20,7 +19,7 @@ def find_page(headers, title):
             "timestamp": "last_edited_time"
         }
     }
-    response = requests.post(url, json=payload, headers=headers)
+    response = notion_client.request("POST", url, headers, json=payload)
     if response.status_code != 200:
         notion_client.fail(f"Search failed: {response.text}")
     
@@ -57,7 +56,7 @@ def create_page(headers, parent_id, title):
         ]
     }
     
-    response = requests.post(url, json=payload, headers=headers)
+    response = notion_client.request("POST", url, headers, json=payload)
     if response.status_code != 200:
         notion_client.fail(f"Create page failed: {response.text}")
         
@@ -0,0 +1,148 @@
+import os
+import html
+
+# Local renderers for Notion block trees (as built by sync_dashboard.create_blocks),
+# so the dashboard layout can be checked without talking to the API.
+
+LIST_TYPES = {"bulleted_list_item": "ul", "numbered_list_item": "ol", "to_do": "ul"}
+
+def plain_text(rich_text):
+    return "".join(rt.get("text", {}).get("content", "") for rt in rich_text)
+
+def _md_text(rich_text):
+    parts = []
+    for rt in rich_text:
+        content = rt.get("text", {}).get("content", "")
+        annotations = rt.get("annotations", {})
+        # Emphasis markers must hug the text, so surrounding whitespace stays outside
+        core = content.strip()
+        if core and (annotations.get("bold") or annotations.get("italic")):
+            lead = content[:len(content) - len(content.lstrip())]
+            trail = content[len(content.rstrip()):]
+            if annotations.get("bold"):
+                core = f"**{core}**"
+            if annotations.get("italic"):
+                core = f"*{core}*"
+            content = lead + core + trail
+        parts.append(content)
+    return "".join(parts)
+
+def _html_text(rich_text):
+    parts = []
+    for rt in rich_text:
+        content = html.escape(rt.get("text", {}).get("content", ""))
+        annotations = rt.get("annotations", {})
+        if annotations.get("bold"):
+            content = f"<strong>{content}</strong>"
+        if annotations.get("italic"):
+            content = f"<em>{content}</em>"
+        parts.append(content)
+    return "".join(parts)
+
+def _table_rows(block):
+    return [row["table_row"]["cells"] for row in block["table"].get("children", [])]
+
+def render_markdown(blocks):
+    lines = []
+    previous = None
+    for block in blocks:
+        kind = block["type"]
+        body = block[kind]
+        text = _md_text(body.get("rich_text", []))
+
+        # Keep list items together, separate everything else with a blank line
+        if lines and not (kind == previous and kind in LIST_TYPES):
+            lines.append("")
+
+        if kind.startswith("heading_"):
+            lines.append("#" * int(kind[-1]) + " " + text)
+        elif kind == "quote":
+            lines.append(f"> {text}")
+        elif kind == "callout":
+            emoji = body.get("icon", {}).get("emoji")
+            lines.append(f"> {emoji} {text}" if emoji else f"> {text}")
+        elif kind == "paragraph":
+            lines.append(text)
+        elif kind == "bulleted_list_item":
+            lines.append(f"- {text}")
+        elif kind == "numbered_list_item":
+            lines.append(f"1. {text}")
+        elif kind == "to_do":
+            lines.append(f"- [{'x' if body.get('checked') else ' '}] {text}")
+        elif kind == "table":
+            rows = _table_rows(block)
+            for i, cells in enumerate(rows):
+                lines.append("| " + " | ".join(_md_text(c).replace("|", "\\|") for c in cells) + " |")
+                if i == 0 and body.get("has_column_header"):
+                    lines.append("|" + " --- |" * len(cells))
+        else:
+            lines.append(f"<!-- unsupported block: {kind} -->")
+        previous = kind
+
+    return "\n".join(lines) + "\n"
+
+def render_html(blocks):
+    out = []
+    open_list = None
+    for block in blocks:
+        kind = block["type"]
+        body = block[kind]
+        text = _html_text(body.get("rich_text", []))
+
+        list_tag = LIST_TYPES.get(kind)
+        if open_list and open_list != (kind, list_tag):
+            out.append(f"</{open_list[1]}>")
+            open_list = None
+        if list_tag and not open_list:
+            out.append(f"<{list_tag}>")
+            open_list = (kind, list_tag)
+
+        if kind.startswith("heading_"):
+            out.append(f"<h{kind[-1]}>{text}</h{kind[-1]}>")
+        elif kind == "quote":
+            out.append(f"<blockquote>{text}</blockquote>")
+        elif kind == "callout":
+            emoji = html.escape(body.get("icon", {}).get("emoji", ""))
+            out.append(f'<div class="callout">{emoji} {text}</div>')
+        elif kind == "paragraph":
+            out.append(f"<p>{text}</p>")
+        elif kind == "to_do":
+            checked = " checked" if body.get("checked") else ""
+            out.append(f'<li><input type="checkbox" disabled{checked}> {text}</li>')
+        elif list_tag:
+            out.append(f"<li>{text}</li>")
+        elif kind == "table":
+            out.append("<table>")
+            for i, cells in enumerate(_table_rows(block)):
+                tag = "th" if i == 0 and body.get("has_column_header") else "td"
+                out.append("<tr>" + "".join(f"<{tag}>{_html_text(c)}</{tag}>" for c in cells) + "</tr>")
+            out.append("</table>")
+        else:
+            out.append(f"<!-- unsupported block: {html.escape(kind)} -->")
+
+    if open_list:
+        out.append(f"</{open_list[1]}>")
+
+    title = "Dashboard"
+    if blocks and blocks[0]["type"].startswith("heading_"):
+        title = plain_text(blocks[0][blocks[0]["type"]].get("rich_text", []))
+    return (
+        "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n"
+        f"<title>{html.escape(title)}</title>\n</head>\n<body>\n"
+        + "\n".join(out)
+        + "\n</body>\n</html>\n"
+    )
+
+# Output format -> (renderer, default file extension)
+BACKENDS = {
+    "markdown": (render_markdown, "md"),
+    "html": (render_html, "html"),
+}
+
+def write(blocks, fmt, path=None):
+    """Render `blocks` with the given backend to a local file. Returns the path."""
+    renderer, ext = BACKENDS[fmt]
+    path = path or os.path.join(os.getcwd(), f"dashboard.{ext}")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(renderer(blocks))
+    return path
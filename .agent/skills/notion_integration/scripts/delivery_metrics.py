@@ -0,0 +1,191 @@
+import os
+import json
+import hashlib
+import notion_client
+from datetime import datetime, timezone
+
+METRICS_FILE = '.delivery_metrics.json'
+MAX_INVALID_ENTRIES = 20
+
+def issue_is_open(issue):
+    """Single definition of an open issue, shared with the spec cross-reference index."""
+    return issue.get("status") != "RESOLVED"
+
+def load_transitions():
+    """Map action -> {from_phase: to_phase} from state_transitions.json."""
+    path = os.path.join(os.getcwd(), 'state_transitions.json')
+    if not os.path.exists(path):
+        notion_client.fail(f"state_transitions.json not found at {path}")
+    with open(path, 'r') as f:
+        data = json.load(f)
+
+    transitions = {}
+    for t in data.get("transitions", []):
+        transitions.setdefault(t["action"], {})[t["from"]] = t["to"]
+    return transitions
+
+def empty_metrics():
+    return {
+        "checkpoint": 0,
+        "checkpoint_digest": None,
+        "phase": None,
+        "phase_since": None,
+        "phase_durations": {},
+        "transition_counts": {},
+        "event_counts": {},
+        "invalid_count": 0,
+        "invalid_entries": [],
+        "issues": {}
+    }
+
+def entry_digest(entry):
+    canonical = json.dumps(entry, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+def parse_timestamp(value):
+    if not value:
+        return None
+    try:
+        ts = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (TypeError, ValueError):
+        return None
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+def record_invalid(metrics, index, reason):
+    metrics["invalid_count"] += 1
+    metrics["invalid_entries"].append({"index": index, "reason": reason})
+    del metrics["invalid_entries"][:-MAX_INVALID_ENTRIES]
+
+def apply_entry(metrics, index, entry, transitions):
+    phase = entry.get("phase")
+    action = entry.get("action")
+    ts = parse_timestamp(entry.get("timestamp"))
+    if not phase or not action or not ts:
+        record_invalid(metrics, index, "missing phase, action or timestamp")
+        return
+
+    if metrics["phase"] and phase != metrics["phase"]:
+        # The entry disagrees with where the transitions left us; trust the entry
+        record_invalid(metrics, index, f"phase {phase} does not follow {metrics['phase']}")
+
+    # Time since the previous entry is attributed to the phase the entry was recorded in
+    out_of_order = False
+    if metrics["phase"] and metrics["phase_since"]:
+        elapsed = (ts - parse_timestamp(metrics["phase_since"])).total_seconds()
+        if elapsed < 0:
+            # Skip the duration only; the transition below still applies
+            record_invalid(metrics, index, "timestamp earlier than previous entry")
+            out_of_order = True
+        else:
+            durations = metrics["phase_durations"]
+            durations[phase] = durations.get(phase, 0) + elapsed
+
+    next_phase = phase
+    if action in transitions:
+        if phase in transitions[action]:
+            next_phase = transitions[action][phase]
+            counts = metrics["transition_counts"]
+            counts[action] = counts.get(action, 0) + 1
+        else:
+            record_invalid(metrics, index, f"{action} is not allowed from {phase}")
+    else:
+        # Not a lifecycle transition (e.g. FEATURE_DEPLOY); phase is unchanged
+        counts = metrics["event_counts"]
+        counts[action] = counts.get(action, 0) + 1
+
+    metrics["phase"] = next_phase
+    if not out_of_order:
+        # Keep measuring from the latest timestamp so no time is counted twice
+        metrics["phase_since"] = ts.isoformat()
+
+def update_issues(metrics, issues):
+    # Issues can be edited or reopened in place, so they are recomputed every run
+    known = metrics["issues"] = {}
+    for issue in issues:
+        issue_id = issue.get("id")
+        if not issue_id:
+            continue
+
+        opened = parse_timestamp(issue.get("created_at"))
+        resolved = parse_timestamp(issue.get("resolved_at"))
+        lead_time = None
+        if opened and resolved and resolved >= opened:
+            lead_time = (resolved - opened).total_seconds()
+
+        known[issue_id] = {
+            "status": issue.get("status"),
+            "open": issue_is_open(issue),
+            "opened_at": opened.isoformat() if opened else None,
+            "resolved_at": resolved.isoformat() if resolved else None,
+            "lead_time": lead_time
+        }
+
+def update_metrics(state, metrics=None, transitions=None):
+    """Fold history entries appended since the last checkpoint into `metrics`."""
+    metrics = metrics or empty_metrics()
+    transitions = transitions if transitions is not None else load_transitions()
+    history = state.get("history", [])
+
+    checkpoint = metrics["checkpoint"]
+    if checkpoint > len(history) or (checkpoint and entry_digest(history[checkpoint - 1]) != metrics["checkpoint_digest"]):
+        # History was rewritten rather than appended to; start over
+        metrics = empty_metrics()
+        checkpoint = 0
+
+    for index in range(checkpoint, len(history)):
+        apply_entry(metrics, index, history[index], transitions)
+
+    if history:
+        metrics["checkpoint"] = len(history)
+        metrics["checkpoint_digest"] = entry_digest(history[-1])
+
+    update_issues(metrics, state.get("issues", []))
+    return metrics
+
+def get_delivery_metrics(state, persist=True):
+    """Load the materialized metrics, apply new history and persist the checkpoint."""
+    with notion_client.cache_lock:
+        metrics = update_metrics(state, notion_client.load_cache(METRICS_FILE) or None)
+        if persist:
+            notion_client.save_cache(metrics, METRICS_FILE)
+    return metrics
+
+def format_duration(seconds):
+    hours = int(seconds // 3600)
+    days, hours = divmod(hours, 24)
+    if days:
+        return f"{days}d {hours}h"
+    minutes = int(seconds % 3600 // 60)
+    return f"{hours}h {minutes}m"
+
+def metrics_rows(metrics):
+    """(Metric, Value) rows for the dashboard table."""
+    rows = []
+    for phase, seconds in sorted(metrics["phase_durations"].items()):
+        rows.append((f"Time in {phase}", format_duration(seconds)))
+    for action, count in sorted(metrics["transition_counts"].items()):
+        rows.append((f"{action} transitions", str(count)))
+
+    issues = metrics["issues"].values()
+    lead_times = sorted(i["lead_time"] for i in issues if i["lead_time"] is not None)
+    open_count = sum(1 for i in issues if i["open"])
+    rows.append(("Open issues", str(open_count)))
+    rows.append(("Resolved issues", str(len(metrics["issues"]) - open_count)))
+    if lead_times:
+        rows.append(("Mean issue lead time", format_duration(sum(lead_times) / len(lead_times))))
+        rows.append(("Median issue lead time", format_duration(lead_times[len(lead_times) // 2])))
+
+    if metrics["invalid_count"]:
+        rows.append(("Invalid history entries", str(metrics["invalid_count"])))
+    return rows
+
+def main():
+    import sync_dashboard
+    metrics = get_delivery_metrics(sync_dashboard.get_project_state())
+    for metric, value in metrics_rows(metrics):
+        print(f"{metric}: {value}")
+    for invalid in metrics["invalid_entries"]:
+        print(f"[WARN] history[{invalid['index']}]: {invalid['reason']}")
+
+if __name__ == "__main__":
+    main()
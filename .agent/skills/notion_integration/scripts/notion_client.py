@@ -1,7 +1,15 @@
 import os
 import sys
+import json
+import time
+import threading
+import contextlib
+from collections import deque
 import requests
 
+# Local sync state (page IDs, fingerprints, ...) persisted between runs
+CACHE_FILE = '.notion_sync_cache.json'
+
 # Manually load .env file
 def load_env():
     env_path = os.path.join(os.getcwd(), '.env')
@@ -31,3 +39,403 @@ def get_notion_headers():
 def fail(msg):
     print(f"[ERROR] {msg}")
     sys.exit(1)
+
+
+def load_cache(filename=CACHE_FILE):
+    cache_path = os.path.join(os.getcwd(), filename)
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # A corrupt cache only costs us a full sync
+        print(f"[WARN] Ignoring unreadable cache: {cache_path}")
+        return {}
+
+def save_cache(cache, filename=CACHE_FILE):
+    cache_path = os.path.join(os.getcwd(), filename)
+    # Write a temp file and swap it in, so a concurrent load_cache() never
+    # sees a half-written file
+    tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, cache_path)
+
+# Held around every read-modify-write of a local state file
+cache_lock = threading.RLock()
+
+def update_cache(mutate, filename=CACHE_FILE):
+    """Read-modify-write the cache so concurrent syncs don't drop each other's entries."""
+    with cache_lock:
+        cache = load_cache(filename)
+        mutate(cache)
+        save_cache(cache, filename)
+
+API_URL = "https://api.notion.com/v1"
+
+# --- Request scheduling ---
+# Notion allows ~3 requests/sec per integration. Requests are sent through
+# one scheduler per process so latency-sensitive work (dashboard, bugs) is
+# not stuck behind a bulk Kanban backfill running in another thread.
+
+LANE_INTERACTIVE = "interactive"
+LANE_BULK = "bulk"
+
+RATE_LIMIT = 3.0 # requests per second
+LANE_WEIGHTS = {LANE_INTERACTIVE: 3, LANE_BULK: 1} # share of slots while both lanes are busy
+MAX_WAIT = 5.0 # seconds; a request waiting this long is served next regardless of lane
+MAX_RETRIES = 3
+
+class RequestScheduler:
+    """
+    Hands out request slots at RATE_LIMIT using weighted round robin between
+    lanes, in LANE_WEIGHTS order. An idle lane's share goes to the others, and
+    a busy lane that has not been served for MAX_WAIT goes next (starvation guard).
+    """
+
+    def __init__(self, rate=RATE_LIMIT, weights=LANE_WEIGHTS, max_wait=MAX_WAIT):
+        self.interval = 1.0 / rate
+        self.weights = dict(weights)
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._waiting = {lane: deque() for lane in self.weights}
+        self._credits = dict(self.weights)
+        self._last_served = {lane: 0.0 for lane in self.weights}
+        self._next_slot = 0.0
+
+    def _pick(self, now):
+        busy = [lane for lane, queue in self._waiting.items() if queue]
+        if not busy:
+            return None
+
+        starved = min(busy, key=lambda lane: self._last_served[lane])
+        if now - self._last_served[starved] >= self.max_wait:
+            return starved
+
+        for _ in range(2):
+            for lane in busy:
+                if self._credits[lane] > 0:
+                    return lane
+            # Every busy lane used its share this round
+            self._credits = dict(self.weights)
+        return busy[0]
+
+    def acquire(self, lane):
+        """Block until this request may be sent."""
+        ticket = object()
+        with self._cond:
+            if not self._waiting[lane]:
+                # Starvation is measured from when the lane started waiting
+                self._last_served[lane] = time.monotonic()
+            self._waiting[lane].append(ticket)
+            while True:
+                now = time.monotonic()
+                chosen = self._pick(now)
+                if chosen == lane and self._waiting[lane][0] is ticket and now >= self._next_slot:
+                    self._waiting[lane].popleft()
+                    self._credits[lane] -= 1
+                    self._last_served[lane] = now
+                    self._next_slot = max(now, self._next_slot) + self.interval
+                    self._cond.notify_all()
+                    return
+                self._cond.wait(max(self._next_slot - now, 0.01))
+
+    def pause(self, seconds):
+        """Hold every lane back, e.g. after a 429 with Retry-After."""
+        with self._cond:
+            self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+scheduler = RequestScheduler()
+_context = threading.local()
+
+@contextlib.contextmanager
+def lane(name):
+    """Send requests made by this thread inside the block through `name`."""
+    previous = getattr(_context, "lane", LANE_INTERACTIVE)
+    _context.lane = name
+    try:
+        yield
+    finally:
+        _context.lane = previous
+
+def request(method, url, headers, json=None, lane=None):
+    """requests.request() behind the shared scheduler, retrying on 429."""
+    lane = lane or getattr(_context, "lane", LANE_INTERACTIVE)
+    for attempt in range(MAX_RETRIES + 1):
+        scheduler.acquire(lane)
+        response = requests.request(method, url, json=json, headers=headers)
+        if response.status_code != 429 or attempt == MAX_RETRIES:
+            return response
+        retry_after = float(response.headers.get("Retry-After", 1))
+        print(f"[WARN] Rate limited, retrying in {retry_after}s")
+        scheduler.pause(retry_after)
+
+def _property_types(properties):
+    return {name: prop.get("type") for name, prop in properties.items()}
+
+def cached_database_id(title):
+    """Database ID resolved on a previous run, if any."""
+    return load_cache().get("databases", {}).get(title, {}).get("id")
+
+def _store_schema(title, db_id, property_types):
+    def mutate(cache):
+        cache.setdefault("databases", {})[title] = {"id": db_id, "properties": property_types}
+    update_cache(mutate)
+
+def remember_database(title, db_id, properties):
+    """Store a database ID and its schema (as returned by the API)."""
+    _store_schema(title, db_id, _property_types(properties))
+
+def forget_database(title):
+    """Drop a cached database after a write proved the cache stale."""
+    update_cache(lambda cache: cache.get("databases", {}).pop(title, None))
+
+def is_stale_schema_error(response):
+    """True if a failed write suggests the cached database ID or schema is out of date."""
+    if response.status_code == 404:
+        return True
+    if response.status_code == 400:
+        try:
+            return response.json().get("code") == "validation_error"
+        except ValueError:
+            return False
+    return False
+
+def _schema_mismatches(required, properties, types):
+    """
+    Required properties that exist under the right name but can't hold our values.
+
+    `properties` is the raw API schema, or None when only cached types are known
+    (those were checked when they were retrieved).
+    """
+    problems = []
+    for name, schema in required.items():
+        if name not in types:
+            continue
+        expected = next(iter(schema))
+        actual = types[name]
+        if actual == expected:
+            continue
+        if expected == "select" and actual == "status":
+            # Native status works too, but the API can't add status options
+            if properties is None:
+                continue
+            have = {o["name"] for o in properties[name]["status"].get("options", [])}
+            missing = [o["name"] for o in schema["select"].get("options", []) if o["name"] not in have]
+            if missing:
+                problems.append(f"'{name}' is a status property without options: {', '.join(missing)}")
+            continue
+        problems.append(f"'{name}' is {actual}, expected {expected}")
+    return problems
+
+def ensure_database_schema(headers, title, db_id, required):
+    """
+    Make sure `required` ({name: property schema}) exists on the database.
+
+    The schema is retrieved once and cached with the database ID; missing
+    properties are added in a single PATCH. Existing properties of the wrong
+    type are reported and abort the sync. Returns {name: property type}.
+    """
+    entry = load_cache().get("databases", {}).get(title, {})
+    if entry.get("id") == db_id and "properties" in entry:
+        raw, properties = None, entry["properties"]
+    else:
+        response = request("GET", f"{API_URL}/databases/{db_id}", headers)
+        if response.status_code != 200:
+            fail(f"Failed to retrieve database schema: {response.text}")
+        raw = response.json().get("properties", {})
+        properties = _property_types(raw)
+
+    mismatches = _schema_mismatches(required, raw, properties)
+    if mismatches:
+        forget_database(title)
+        fail(f"Database '{title}' has incompatible properties (fix them in Notion): " + "; ".join(mismatches))
+
+    missing = {name: schema for name, schema in required.items() if name not in properties}
+    if missing:
+        print(f"Adding properties to '{title}': {', '.join(missing)}")
+        response = request("PATCH", f"{API_URL}/databases/{db_id}", headers, json={"properties": missing})
+        if response.status_code != 200:
+            fail(f"Failed to update database schema: {response.text}")
+        properties = _property_types(response.json().get("properties", {}))
+
+    _store_schema(title, db_id, properties)
+    return properties
+
+def title_property(schema, default="Name"):
+    for name, prop_type in schema.items():
+        if prop_type == "title":
+            return name
+    return default
+
+def option_value(schema, name, value):
+    """Value for a select-like property; native 'status' is accepted by ensure_database_schema."""
+    return {schema.get(name, "select"): {"name": value}}
+
+
+class PendingRef:
+    """Placeholder for the ID of an object that has not been created yet."""
+
+    def __init__(self, label):
+        self.label = label
+        self.id = None
+        self.failed = False
+
+    def __repr__(self):
+        return f"<PendingRef {self.label}: {self.id}>"
+
+def _collect_refs(value, found):
+    if isinstance(value, PendingRef):
+        found.append(value)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _collect_refs(item, found)
+    elif isinstance(value, list):
+        for item in value:
+            _collect_refs(item, found)
+    return found
+
+def _resolve_refs(value):
+    if isinstance(value, PendingRef):
+        return value.id
+    if isinstance(value, dict):
+        return {k: _resolve_refs(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_resolve_refs(v) for v in value]
+    return value
+
+def _merge_payload(target, payload):
+    # Later writes win per property; anything else is replaced wholesale
+    for key, value in payload.items():
+        if key == "properties" and key in target:
+            target[key].update(value)
+        else:
+            target[key] = value
+
+class WriteQueue:
+    """
+    Collects page writes and sends them on flush().
+
+    - Updates to the same object are merged into one request, so a property
+      written twice only sends its final value.
+    - Updates to an object that is still waiting to be created are folded
+      into the create request (unless they reference the object itself).
+    - Writes that reference a PendingRef are sent after the create that
+      resolves it. If that create fails, properties referencing it (e.g. a
+      Parent Task relation) are left out and the write is sent anyway.
+
+    Failed requests are collected in `failures` as (label, response).
+    """
+
+    def __init__(self, headers, lane=None):
+        self.headers = headers
+        self.lane = lane
+        self.failures = []
+        self._ops = []
+        self._updates = {}  # (kind, target) -> op
+        self._creates = {}  # PendingRef -> op
+
+    def create_page(self, payload, label=None):
+        return self._create("pages", payload, label)
+
+    def update_page(self, page, properties):
+        self._update("pages", page, {"properties": properties})
+
+    def _create(self, kind, payload, label):
+        ref = PendingRef(label or kind)
+        op = {"method": "POST", "kind": kind, "target": None, "ref": ref, "payload": payload}
+        self._ops.append(op)
+        self._creates[ref] = op
+        return ref
+
+    def _update(self, kind, target, payload):
+        pending_create = self._creates.get(target)
+        if pending_create and pending_create["kind"] == kind and target not in _collect_refs(payload, []):
+            _merge_payload(pending_create["payload"], payload)
+            return
+
+        key = (kind, target)
+        if key in self._updates:
+            _merge_payload(self._updates[key]["payload"], payload)
+            return
+
+        op = {"method": "PATCH", "kind": kind, "target": target, "ref": None, "payload": payload}
+        self._ops.append(op)
+        self._updates[key] = op
+
+    def __len__(self):
+        return len(self._ops)
+
+    def flush(self):
+        """Send all pending writes in dependency order. Returns the number of requests made."""
+        pending = self._ops
+        self._ops, self._updates, self._creates = [], {}, {}
+        sent = 0
+
+        while pending:
+            ready, waiting = [], []
+            for op in pending:
+                if not self._drop_failed_refs(op):
+                    continue
+                refs = _collect_refs(op["payload"], [])
+                if isinstance(op["target"], PendingRef):
+                    refs.append(op["target"])
+                # A create never waits on its own ref
+                refs = [r for r in refs if r is not op["ref"]]
+                (ready if all(r.id for r in refs) else waiting).append(op)
+
+            if not ready:
+                # Only possible with a dependency cycle
+                for op in waiting:
+                    print(f"[WARN] Dropping write to {self._label(op)}: circular dependency")
+                break
+
+            for op in ready:
+                self._send(op)
+                sent += 1
+            pending = waiting
+
+        return sent
+
+    @staticmethod
+    def _label(op):
+        return op["ref"].label if op["ref"] else op["target"]
+
+    def _drop_failed_refs(self, op):
+        """Strip properties that point at a failed create. Returns False if the op can't be sent."""
+        if isinstance(op["target"], PendingRef) and op["target"].failed:
+            print(f"[WARN] Dropping write to {op['target'].label}: it was never created")
+            return False
+
+        properties = op["payload"].get("properties", {})
+        for name in list(properties):
+            failed = [r for r in _collect_refs(properties[name], []) if r.failed]
+            if failed:
+                print(f"[WARN] Sending {self._label(op)} without '{name}': {failed[0].label} was not created")
+                del properties[name]
+
+        rest = {k: v for k, v in op["payload"].items() if k != "properties"}
+        if any(r.failed for r in _collect_refs(rest, [])):
+            print(f"[WARN] Dropping write to {self._label(op)}: dependency was not created")
+            return False
+        return True
+
+    def _send(self, op):
+        target = op["target"]
+        if isinstance(target, PendingRef):
+            target = target.id
+
+        url = f"{API_URL}/{op['kind']}" if op["method"] == "POST" else f"{API_URL}/{op['kind']}/{target}"
+        response = request(op["method"], url, self.headers, json=_resolve_refs(op["payload"]), lane=self.lane)
+        if response.status_code != 200:
+            label = op["ref"].label if op["ref"] else target
+            print(f"[WARN] {op['method']} {op['kind']} failed for {label}: {response.text}")
+            self.failures.append((label, response))
+            if op["ref"]:
+                op["ref"].failed = True
+            return
+
+        if op["ref"]:
+            op["ref"].id = response.json()["id"]
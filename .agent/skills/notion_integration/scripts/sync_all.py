@@ -0,0 +1,45 @@
+import sys
+import argparse
+import threading
+import notion_client
+import sync_bugs
+import sync_dashboard
+import sync_kanban
+
+def run_kanban(argv, dashboard_id, result):
+    # notion_client.fail() raises SystemExit, which a thread would swallow
+    try:
+        sync_kanban.main(argv, dashboard_id=dashboard_id)
+    except SystemExit as e:
+        result["exit_code"] = e.code
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("task_path", nargs="?", help="Path to task.md file (skip Kanban sync if omitted)")
+    parser.add_argument("--force", action="store_true", help="Passed through to sync_dashboard")
+    args = parser.parse_args()
+
+    headers = notion_client.get_notion_headers()
+    # Resolve the dashboard once, so the Kanban thread never has to create it
+    dashboard_id = sync_dashboard.resolve_dashboard(headers)
+
+    # The Kanban backfill runs in the background on the bulk lane; dashboard
+    # and bug updates share the same rate budget but are scheduled ahead of it.
+    kanban, kanban_result = None, {}
+    if args.task_path:
+        kanban = threading.Thread(target=run_kanban, args=([args.task_path], dashboard_id, kanban_result), name="kanban")
+        kanban.start()
+
+    dashboard_args = ["--force"] if args.force else []
+    if args.task_path:
+        dashboard_args += ["--tasks", args.task_path]
+    sync_dashboard.main(dashboard_args, page_id=dashboard_id)
+    sync_bugs.main()
+
+    if kanban:
+        kanban.join()
+        if kanban_result.get("exit_code"):
+            sys.exit(kanban_result["exit_code"])
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,39 @@
-import requests
 import json
 import notion_client
 import sync_dashboard # Share get_project_state
 
 DB_TITLE = "Indie Studio Bugs"
 
+# Properties every bug row is written with (added to the database if missing)
+BUG_PROPERTIES = {
+    "Bug ID": {"rich_text": {}},
+    "Status": {
+        "select": {
+            "options": [
+                {"name": "To Do", "color": "gray"},
+                {"name": "In Progress", "color": "blue"},
+                {"name": "Done", "color": "green"}
+            ]
+        }
+    },
+    "Priority": {
+        "select": {
+            "options": [
+                {"name": "LOW", "color": "gray"},
+                {"name": "MEDIUM", "color": "yellow"},
+                {"name": "HIGH", "color": "orange"},
+                {"name": "CRITICAL", "color": "red"}
+            ]
+        }
+    }
+}
+
+STATUS_MAP = {
+    "OPEN": "To Do",
+    "IN_PROGRESS": "In Progress",
+    "RESOLVED": "Done"
+}
+
 def find_database(headers):
     url = "https://api.notion.com/v1/search"
     payload = {
@@ -18,7 +47,7 @@ def find_database(headers):
             "timestamp": "last_edited_time"
         }
     }
-    response = requests.post(url, json=payload, headers=headers)
+    response = notion_client.request("POST", url, headers, json=payload)
     if response.status_code != 200:
         return None
     
@@ -27,51 +56,86 @@ def find_database(headers):
         return results[0].get("id")
     return None
 
-def sync_issues(headers, db_id, issues):
-    # This is a one-way sync from State -> Notion for now.
-    # To truly sync, we'd need to query existing items and update or add new ones.
-    # For MVP: We just print what we WOULLD do, or add new items.
+def _plain_text(rich_text):
+    return "".join(rt.get("plain_text") or rt.get("text", {}).get("content", "") for rt in rich_text)
+
+def _option_name(prop):
+    value = prop.get(prop.get("type", "select")) or {}
+    return value.get("name")
+
+def get_existing_issues(headers, db_id, schema):
+    """
+    Existing rows keyed by Bug ID, plus untagged rows keyed by title
+    (rows created before the Bug ID property was synced).
+    """
+    url = f"https://api.notion.com/v1/databases/{db_id}/query"
+    title_name = notion_client.title_property(schema)
+    has_more = True
+    next_cursor = None
+    by_id, by_title = {}, {}
+    
+    while has_more:
+        payload = {"start_cursor": next_cursor} if next_cursor else {}
+        response = notion_client.request("POST", url, headers, json=payload)
+        if response.status_code != 200:
+            # Cached ID may point at a deleted database; look it up again next run
+            notion_client.forget_database(DB_TITLE)
+            notion_client.fail(f"Failed to query database: {response.text}")
+        data = response.json()
+        
+        for result in data['results']:
+            props = result['properties']
+            row = {
+                "id": result['id'],
+                "title": _plain_text(props.get(title_name, {}).get('title', [])),
+                "status": _option_name(props.get('Status', {})),
+                "priority": _option_name(props.get('Priority', {}))
+            }
+            bug_id = _plain_text(props.get('Bug ID', {}).get('rich_text', []))
+            if bug_id:
+                by_id[bug_id] = row
+            else:
+                by_title[row["title"]] = row
+                
+        has_more = data.get('has_more', False)
+        next_cursor = data.get('next_cursor')
+        
+    return by_id, by_title
+
+def sync_issues(headers, db_id, issues, schema):
+    # One-way sync from State -> Notion: rows are matched by Bug ID and only
+    # written when they are new or their title, status or priority changed.
     
     print(f"Syncing {len(issues)} issues to Database {db_id}...")
+    by_id, by_title = get_existing_issues(headers, db_id, schema)
     
+    stale = False
+    written = 0
     for issue in issues:
-        # Check if issue already exists (by title usually)
-        # This requires querying the DB.
-        # MVP: Just create one to test, or skip if complex.
-        # Let's just create one generic item for testing.
-        create_issue_item(headers, db_id, issue)
+        title = issue.get("description", "Unnamed Issue")
+        status = STATUS_MAP.get(issue.get("status"), "To Do")
+        priority = issue.get("priority", "MEDIUM")
+        
+        row = by_id.get(issue.get("id"))
+        if row and (row["title"], row["status"], row["priority"]) == (title, status, priority):
+            continue
+        row = row or by_title.get(title)
+        
+        response = write_issue_item(headers, db_id, row["id"] if row else None, issue, schema)
+        written += 1
+        if response.status_code != 200:
+            print(f"[WARN] Failed to write issue {issue.get('id')}: {response.text}")
+            stale = stale or notion_client.is_stale_schema_error(response)
+    
+    print(f"{written} issue(s) written, {len(issues) - written} unchanged.")
+    if stale:
+        # Cached ID or schema no longer matches Notion; resolve again next run
+        notion_client.forget_database(DB_TITLE)
 
-def create_issue_item(headers, db_id, issue):
-    url = "https://api.notion.com/v1/pages"
-    payload = {
-        "parent": { "database_id": db_id },
-        "properties": {
-            "Name": {
-                "title": [
-                    {
-                        "text": {
-                            "content": issue.get("description", "Unnamed Issue")
-                        }
-                    }
-                ]
-            },
-            "Status": {
-                "select": {
-                    "name": "To Do"
-                }
-            },
-           "Priority": {
-                "select": {
-                    "name": issue.get("priority", "MED")
-                }
-            }
-        }
-    }
-    # Note: This will fail if "Status" or "Priority" properties don't exist in the DB schema.
-    # So we should be careful. 
-    # Safety: Only try to set Name first.
-    payload["properties"] = {
-        "Name": {
+def write_issue_item(headers, db_id, page_id, issue, schema):
+    """Create the issue row, or update `page_id` if the row already exists."""
+    properties = {
+        notion_client.title_property(schema): {
             "title": [
                 {
                     "text": {
@@ -79,10 +143,20 @@ def create_issue_item(headers, db_id, issue):
                     }
                 }
             ]
-        }
+        },
+        "Bug ID": {"rich_text": [{"text": {"content": issue.get("id", "")}}]},
+        "Status": notion_client.option_value(schema, "Status", STATUS_MAP.get(issue.get("status"), "To Do")),
+        "Priority": notion_client.option_value(schema, "Priority", issue.get("priority", "MEDIUM"))
     }
     
-    requests.post(url, json=payload, headers=headers)
+    if page_id:
+        return notion_client.request("PATCH", f"https://api.notion.com/v1/pages/{page_id}", headers, json={"properties": properties})
+    
+    payload = {
+        "parent": { "database_id": db_id },
+        "properties": properties
+    }
+    return notion_client.request("POST", "https://api.notion.com/v1/pages", headers, json=payload)
 
 def main():
     headers = notion_client.get_notion_headers()
@@ -93,14 +167,17 @@ def main():
         print("No issues to sync.")
         return
 
-    print("Finding bugs database...")
-    db_id = find_database(headers)
+    db_id = notion_client.cached_database_id(DB_TITLE)
+    if not db_id:
+        print("Finding bugs database...")
+        db_id = find_database(headers)
     
     if not db_id:
         print(f"[WARN] Database '{DB_TITLE}' not found. Please create it manually.")
         return
-        
-    sync_issues(headers, db_id, issues)
+    
+    schema = notion_client.ensure_database_schema(headers, DB_TITLE, db_id, BUG_PROPERTIES)
+    sync_issues(headers, db_id, issues, schema)
 
 if __name__ == "__main__":
     main()
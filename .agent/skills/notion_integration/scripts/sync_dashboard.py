@@ -1,11 +1,17 @@
-import requests
 import json
 import os
 import re
+import time
+import hashlib
+import argparse
 import notion_client
+import delivery_metrics
+import xref_index
+import dashboard_render
 from datetime import datetime
 
 DASHBOARD_TITLE = "Indie Studio Master Dashboard"
+SYNC_DATE_PREFIX = "Sync Date: "
 
 def get_project_state():
     state_path = os.path.join(os.getcwd(), 'project_state.json')
@@ -18,6 +24,14 @@ def find_dashboard(headers):
     import create_dashboard
     return create_dashboard.find_page(headers, DASHBOARD_TITLE)
 
+def resolve_dashboard(headers):
+    """ID of the dashboard page, creating an empty one if it doesn't exist yet."""
+    page_id = find_dashboard(headers)
+    if not page_id:
+        import create_dashboard
+        page_id = create_dashboard.create_page(headers, create_dashboard.PARENT_PAGE_ID, DASHBOARD_TITLE)
+    return page_id
+
 def get_gdd_details():
     """Extract deep info from GDD file."""
     gdd_path = os.path.join(os.getcwd(), 'TheDailyCipher_GDD.md')
@@ -91,6 +105,7 @@ def get_specs_rich_summary():
 
             specs.append({
                 "id": filename.replace('.md', ''),
+                "filename": filename,
                 "title": title,
                 "summary": summary,
                 "status": status
@@ -120,10 +135,19 @@ def get_arch_details():
         "staging": {"url": stage_url, "bot": stage_bot, "branch": "staging"}
     }
 
-def create_blocks(state):
+def get_tasks(task_path):
+    """Tasks from task.md (same parser as the Kanban sync), if the file exists."""
+    if not task_path or not os.path.exists(task_path):
+        return []
+    import sync_kanban
+    return sync_kanban.parse_task_md(task_path)
+
+def create_blocks(state, tasks=None, persist=True):
+    """Build the dashboard block tree. persist=False leaves the local metrics/xref files untouched."""
     gdd = get_gdd_details()
     specs = get_specs_rich_summary()
     arch = get_arch_details()
+    spec_links = xref_index.get_spec_links(specs, tasks or [], state.get("issues", []), persist=persist)
     
     lifecycle = state.get("lifecycle", {})
     release = state.get("release", {})
@@ -136,7 +160,7 @@ def create_blocks(state):
     
     blocks = [
         {"object": "block", "type": "heading_1", "heading_1": {"rich_text": [{"text": {"content": "🚀 Indie Studio Master Dashboard"}}]}},
-        {"object": "block", "type": "quote", "quote": {"rich_text": [{"text": {"content": f"Sync Date: {now}"}}]}},
+        {"object": "block", "type": "quote", "quote": {"rich_text": [{"text": {"content": f"{SYNC_DATE_PREFIX}{now}"}}]}},
     ]
 
     # SECTION: GAME CONCEPT
@@ -177,10 +201,14 @@ def create_blocks(state):
         blocks.append({"object": "block", "type": "heading_2", "heading_2": {"rich_text": [{"text": {"content": f"📋 Specification Repository ({len(specs)} entries)"}}]}})
         for s in specs:
             icon = "✅" if s['status'] in ['IMPLEMENTED', 'APPROVED'] else "🛠️"
-            blocks.append({"object": "block", "type": "paragraph", "paragraph": {"rich_text": [
+            rich_text = [
                 {"type": "text", "text": {"content": f"{icon} {s['id']}: "}},
                 {"type": "text", "text": {"content": f"{s['summary']}"}}
-            ]}})
+            ]
+            link = spec_links.get(s['id'])
+            if link:
+                rich_text.append({"type": "text", "text": {"content": f" — tasks {link['tasks_done']}/{len(link['tasks'])} done, {link['open_issues']} open bug(s)"}, "annotations": {"italic": True}})
+            blocks.append({"object": "block", "type": "paragraph", "paragraph": {"rich_text": rich_text}})
 
     # SECTION: FIXED BUGS & HISTORY
     blocks.append({"object": "block", "type": "heading_2", "heading_2": {"rich_text": [{"text": {"content": "📜 Recent history & fixed bugs"}}]}})
@@ -190,6 +218,18 @@ def create_blocks(state):
     else:
         blocks.append({"object": "block", "type": "paragraph", "paragraph": {"rich_text": [{"text": {"content": "No history records found."}}]}})
 
+    # SECTION: DELIVERY METRICS
+    rows = delivery_metrics.metrics_rows(delivery_metrics.get_delivery_metrics(state, persist=persist))
+    blocks.append({"object": "block", "type": "heading_2", "heading_2": {"rich_text": [{"text": {"content": "📈 Delivery Metrics"}}]}})
+    blocks.append({"object": "block", "type": "table", "table": {
+        "table_width": 2, "has_column_header": True, "children": [
+            {"type": "table_row", "table_row": {"cells": [[{"text": {"content": "Metric"}}], [{"text": {"content": "Value"}}]]}}
+        ] + [
+            {"type": "table_row", "table_row": {"cells": [[{"text": {"content": metric}}], [{"text": {"content": value}}]]}}
+            for metric, value in rows
+        ]
+    }})
+
     # SECTION: PLANNED IMPROVEMENTS
     blocks.append({"object": "block", "type": "heading_2", "heading_2": {"rich_text": [{"text": {"content": "🗺️ Roadmap & Improvements"}}]}})
     planned = gdd['roadmap'] if gdd else []
@@ -199,32 +239,110 @@ def create_blocks(state):
 
     return blocks
 
+def sync_date_block(blocks):
+    """Return the volatile 'Sync Date' quote block, if present."""
+    for block in blocks:
+        if block.get("type") != "quote":
+            continue
+        rich_text = block["quote"].get("rich_text", [])
+        if rich_text and rich_text[0].get("text", {}).get("content", "").startswith(SYNC_DATE_PREFIX):
+            return block
+    return None
+
+def fingerprint_blocks(blocks):
+    """Canonical hash of the rendered dashboard, ignoring the sync timestamp."""
+    volatile = sync_date_block(blocks)
+    stable = [b for b in blocks if b is not volatile]
+    canonical = json.dumps(stable, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def refresh_sync_date(headers, block_id, block):
+    """Rewrite only the timestamp block. Returns False if the block is gone."""
+    response = notion_client.request(
+        "PATCH",
+        f"https://api.notion.com/v1/blocks/{block_id}",
+        headers,
+        json={"quote": block["quote"]}
+    )
+    if response.status_code != 200:
+        print(f"[WARN] Sync date refresh failed, falling back to full sync: {response.text}")
+        return False
+    print("[OK] Dashboard unchanged, sync date refreshed.")
+    return True
+
 def update_page_content(headers, page_id, blocks):
+    """Replace the page content. Returns the ID of the new sync date block."""
     # Clear existing blocks
     url = f"https://api.notion.com/v1/blocks/{page_id}/children"
-    response = requests.get(url, headers=headers)
+    response = notion_client.request("GET", url, headers)
     if response.status_code == 200:
         for block in response.json().get("results", []):
-            requests.delete(f"https://api.notion.com/v1/blocks/{block['id']}", headers=headers)
+            notion_client.request("DELETE", f"https://api.notion.com/v1/blocks/{block['id']}", headers)
     
     # Append new blocks in chunks of 50 to avoid API limits if needed (though we're likely below)
     payload = {"children": blocks}
-    response = requests.patch(url, json=payload, headers=headers)
+    response = notion_client.request("PATCH", url, headers, json=payload)
     if response.status_code != 200:
         notion_client.fail(f"Update failed: {response.text}")
-    else:
-        print("[OK] Dashboard updated with rich content.")
+    print("[OK] Dashboard updated with rich content.")
+
+    created = sync_date_block(response.json().get("results", []))
+    return created.get("id") if created else None
+
+def main(argv=None, page_id=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--force", action="store_true",
+                        help="Refresh the sync date even if the dashboard content is unchanged")
+    parser.add_argument("--tasks", default="task.md",
+                        help="Path to task.md, used for per-spec task progress")
+    parser.add_argument("--output", choices=["notion"] + sorted(dashboard_render.BACKENDS), default="notion",
+                        help="Where to render the dashboard (local formats never touch the Notion API)")
+    parser.add_argument("--out", help="Output file for local formats (default: dashboard.<ext>)")
+    parser.add_argument("--render-only", action="store_true",
+                        help="Build and render the dashboard offline and print timings (writes no files, makes no API calls)")
+    args = parser.parse_args(argv)
 
-def main():
-    headers = notion_client.get_notion_headers()
     state = get_project_state()
-    page_id = find_dashboard(headers)
-    
-    if not page_id:
-        import create_dashboard
-        page_id = create_dashboard.create_page(headers, create_dashboard.PARENT_PAGE_ID, DASHBOARD_TITLE)
-    
-    update_page_content(headers, page_id, create_blocks(state))
+    start = time.perf_counter()
+    blocks = create_blocks(state, get_tasks(args.tasks), persist=not args.render_only)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    if args.render_only:
+        print(f"Built {len(blocks)} blocks in {build_ms:.1f} ms")
+        for fmt, (renderer, _) in sorted(dashboard_render.BACKENDS.items()):
+            start = time.perf_counter()
+            renderer(blocks)
+            print(f"Rendered {fmt} in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return
+
+    if args.output != "notion":
+        path = dashboard_render.write(blocks, args.output, args.out)
+        print(f"[OK] Dashboard rendered to {path}")
+        return
+
+    headers = notion_client.get_notion_headers()
+    fingerprint = fingerprint_blocks(blocks)
+
+    pushed = notion_client.load_cache().get("dashboard", {})
+    # Only skip if the cached push went to the page we are about to write
+    same_page = pushed.get("page_id") and (page_id is None or pushed["page_id"] == page_id)
+    if pushed.get("fingerprint") == fingerprint and same_page:
+        if not args.force:
+            print("[OK] Dashboard unchanged, nothing to sync.")
+            return
+        block_id = pushed.get("sync_block_id")
+        if block_id and refresh_sync_date(headers, block_id, sync_date_block(blocks)):
+            return
+
+    page_id = page_id or resolve_dashboard(headers)
+    sync_block_id = update_page_content(headers, page_id, blocks)
+    def mutate(cache):
+        cache["dashboard"] = {
+            "page_id": page_id,
+            "fingerprint": fingerprint,
+            "sync_block_id": sync_block_id
+        }
+    notion_client.update_cache(mutate)
 
 if __name__ == "__main__":
     main()
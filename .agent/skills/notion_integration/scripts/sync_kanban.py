@@ -2,7 +2,6 @@ import os
 import re
 import hashlib
 import notion_client 
-import requests
 
 # DB Configuration
 DB_TITLE = "Indie Studio Tasks"
@@ -31,6 +30,8 @@ def parse_task_md(task_path):
         
     tasks = []
     hierarchy = {} # indent -> task_key
+    occurrences = {} # (parent_key, content) -> count, to tell identical tasks apart
+    manual_ids = {} # manual ID -> count, to tell duplicated IDs apart
     
     for i, line in enumerate(lines):
         line_stripped = line.strip()
@@ -68,7 +69,22 @@ def parse_task_md(task_path):
                 
         hierarchy[indent] = task_key
         
+        # Stable ID for cross-references: manual ID, else a hash of the content,
+        # its parent and how many identical siblings came before it
+        occurrence = occurrences.get((parent_key, content), 0)
+        occurrences[(parent_key, content)] = occurrence + 1
+        hashed_id = hashlib.sha1(f"{parent_key}\n{content}\n{occurrence}".encode('utf-8')).hexdigest()[:8]
+        
+        task_id = manual_id or hashed_id
+        if manual_id:
+            seen = manual_ids.get(manual_id, 0)
+            manual_ids[manual_id] = seen + 1
+            if seen:
+                task_id = f"{manual_id}-{seen + 1}"
+                print(f"[WARN] Duplicate task id '{manual_id}' on line {i + 1}; using '{task_id}'")
+        
         tasks.append({
+            "id": task_id,
             "name": content,
             "status": status,
             "parent": parent_key,
@@ -87,76 +103,65 @@ def find_database(headers):
             "property": "object"
         }
     }
-    response = requests.post(url, json=payload, headers=headers)
+    response = notion_client.request("POST", url, headers, json=payload)
     if response.status_code == 200:
         for res in response.json().get('results', []):
             if res['title'][0]['text']['content'] == DB_TITLE:
                 return res['id']
     return None
 
+def task_properties(db_id):
+    """Full Kanban schema. The self-referencing relation needs the database ID."""
+    return {
+        "Status": {
+            "select": {
+                "options": [
+                    {"name": "To Do", "color": "gray"},
+                    {"name": "In Progress", "color": "blue"},
+                    {"name": "Done", "color": "green"}
+                ]
+            }
+        },
+        "Original ID": {"rich_text": {}},
+        # Self-referencing relation for Sub-items
+        "Parent Task": {
+            "relation": {
+                "database_id": db_id,
+                "type": "dual_property",
+                "dual_property": {}
+            }
+        },
+        "Sub-Tasks": { # The other side of the relation
+            "relation": {
+                "database_id": db_id,
+                "type": "dual_property",
+                "dual_property": {}
+            }
+         }
+    }
+
 def create_database(headers, parent_page_id):
     url = "https://api.notion.com/v1/databases"
+    properties = task_properties(None)
+    # Relations can't point at a database that doesn't exist yet;
+    # ensure_database_schema adds them once we have the ID.
+    del properties["Parent Task"], properties["Sub-Tasks"]
+    properties["Task Name"] = {"title": {}}
     payload = {
         "parent": {"type": "page_id", "page_id": parent_page_id},
         "title": [{"type": "text", "text": {"content": DB_TITLE}}],
-        "properties": {
-            "Task Name": {"title": {}},
-            "Status": {
-                "select": {
-                    "options": [
-                        {"name": "To Do", "color": "gray"},
-                        {"name": "In Progress", "color": "blue"},
-                        {"name": "Done", "color": "green"}
-                    ]
-                }
-            },
-            "Original ID": {"rich_text": {}},
-            # Self-referencing relation for Sub-items
-            "Parent Task": {
-                "relation": {
-                    "database_id": "REPLACE_ME_WITH_SELF_ID", # Tricky in creation, usually done in 2 steps
-                    "type": "dual_property",
-                    "dual_property": {}
-                }
-            }
-        }
+        "properties": properties
     }
-    # Relation creation in one go is hard without ID. 
-    # Let's create without Relation first, then update schema.
-    del payload['properties']['Parent Task']
     
-    response = requests.post(url, json=payload, headers=headers)
+    response = notion_client.request("POST", url, headers, json=payload)
     if response.status_code != 200:
         notion_client.fail(f"Failed to create database: {response.text}")
         
-    db_id = response.json()['id']
-    print(f"Created Database: {db_id}")
-    
-    # Update schema to add Parent Relation
-    update_url = f"https://api.notion.com/v1/databases/{db_id}"
-    update_payload = {
-        "properties": {
-            "Parent Task": {
-                "relation": {
-                    "database_id": db_id,
-                    "type": "dual_property",
-                    "dual_property": {}
-                }
-            },
-            "Sub-Tasks": { # The other side of the relation
-                "relation": {
-                    "database_id": db_id,
-                    "type": "dual_property",
-                    "dual_property": {}
-                }
-             }
-        }
-    }
-    # Simplified relation update (Notion API infers the dual property name if not specified or self-ref)
-    # Actually, simpler to just add "Parent Item" and "Sub-item" to mimic Notion's native sub-items
-    
-    requests.patch(update_url, json=update_payload, headers=headers)
-    return db_id
+    db = response.json()
+    print(f"Created Database: {db['id']}")
+    # The create response carries the schema, so no retrieve is needed
+    notion_client.remember_database(DB_TITLE, db['id'], db.get('properties', {}))
+    return db['id']
 
 def get_existing_pages(headers, db_id):
     url = f"https://api.notion.com/v1/databases/{db_id}/query"
@@ -166,7 +171,11 @@ def get_existing_pages(headers, db_id):
     
     while has_more:
         payload = {"start_cursor": next_cursor} if next_cursor else {}
-        response = requests.post(url, json=payload, headers=headers)
+        response = notion_client.request("POST", url, headers, json=payload)
+        if response.status_code != 200:
+            # Cached ID may point at a deleted database; look it up again next run
+            notion_client.forget_database(DB_TITLE)
+            notion_client.fail(f"Failed to query database: {response.text}")
         data = response.json()
         
         for result in data['results']:
@@ -181,7 +190,7 @@ def get_existing_pages(headers, db_id):
         
     return pages
 
-def sync_tasks(headers, db_id, tasks):
+def sync_tasks(headers, db_id, tasks, schema):
     print("Fetching existing Notion tasks...")
     existing_pages = get_existing_pages(headers, db_id)
     
@@ -192,6 +201,11 @@ def sync_tasks(headers, db_id, tasks):
     # Re-build map as we create/update
     current_page_map = existing_pages.copy()
     
+    # Writes are queued so repeated writes to the same row collapse into one
+    # request and children are only sent once their parent has an ID.
+    queue = notion_client.WriteQueue(headers)
+    created = []
+    
     for task in tasks:
         name = task['name']
         status = task['status']
@@ -199,12 +213,12 @@ def sync_tasks(headers, db_id, tasks):
         
         props = {
             "Task Name": {"title": [{"text": {"content": name}}]},
-            "Status": {"select": {"name": status}},
+            "Status": notion_client.option_value(schema, "Status", status),
         }
         if manual_id:
              props["Original ID"] = {"rich_text": [{"text": {"content": manual_id}}]}
              
-        # Resolve Parent (must exist)
+        # Resolve Parent (existing page ID or a pending create)
         parent_name = task.get('parent')
         if parent_name and parent_name in current_page_map:
             parent_id = current_page_map[parent_name]
@@ -212,38 +226,31 @@ def sync_tasks(headers, db_id, tasks):
         
         if name in current_page_map:
             # Update
-            page_id = current_page_map[name]
-            # Optimization: Check if update needed? For now, we update.
-            # Notion API is rate limited (3 requests/sec average). 
-            # We'll rely on small task list or just sequential requests.
-            
-            # Don't overwrite Parent Task if it wasn't specified in our hierarchy (preserve manual edits?)
-            # No, we want strict sync for hierarchy.
-            
-            requests.patch(
-                f"https://api.notion.com/v1/pages/{page_id}",
-                json={"properties": props},
-                headers=headers
-            )
-            # print(f"Updated: {name}")
+            # We want strict sync for hierarchy, so Parent Task is always rewritten.
+            queue.update_page(current_page_map[name], props)
         else:
             # Create
             payload = {
                 "parent": {"database_id": db_id},
                 "properties": props
             }
-            res = requests.post("https://api.notion.com/v1/pages", json=payload, headers=headers)
-            if res.status_code == 200:
-                new_id = res.json()['id']
-                current_page_map[name] = new_id
-                print(f"Created: {name}")
-            else:
-                print(f"Failed to create {name}: {res.text}")
+            ref = queue.create_page(payload, label=name)
+            current_page_map[name] = ref
+            created.append(ref)
+    
+    sent = queue.flush()
+    if any(notion_client.is_stale_schema_error(response) for _, response in queue.failures):
+        # Cached ID or schema no longer matches Notion; resolve again next run
+        notion_client.forget_database(DB_TITLE)
+    for ref in created:
+        if ref.id:
+            print(f"Created: {ref.label}")
+    print(f"Sent {sent} write requests for {len(tasks)} tasks.")
 
-def main():
+def main(argv=None, dashboard_id=None):
     parser = argparse.ArgumentParser()
     parser.add_argument("task_path", help="Path to task.md file")
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     headers = notion_client.get_notion_headers()
     
@@ -254,20 +261,19 @@ def main():
         return
 
     print("Locating database...")
-    db_id = find_database(headers)
+    db_id = notion_client.cached_database_id(DB_TITLE) or find_database(headers)
     if not db_id:
         print("Database not found. Finding Dashboard parent to create it in...")
-        # Find Dashboard Page to put the DB in
+        # Find (or create) the Dashboard Page to put the DB in
         import sync_dashboard
-        parent_id = sync_dashboard.find_dashboard(headers)
-        if not parent_id:
-            print("Dashboard not found. Creating orphan database? Better to create Dashboard first.")
-            sync_dashboard.main() # Ensure content exists
-            parent_id = sync_dashboard.find_dashboard(headers)
-            
+        parent_id = dashboard_id or sync_dashboard.resolve_dashboard(headers)
+
         db_id = create_database(headers, parent_id)
         
-    sync_tasks(headers, db_id, tasks)
+    schema = notion_client.ensure_database_schema(headers, DB_TITLE, db_id, task_properties(db_id))
+    # Task writes are bulk traffic; dashboard/bug updates go ahead of them
+    with notion_client.lane(notion_client.LANE_BULK):
+        sync_tasks(headers, db_id, tasks, schema)
     print("Sync Complete.")
 
 if __name__ == "__main__":
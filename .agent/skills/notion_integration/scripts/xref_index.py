@@ -0,0 +1,116 @@
+import re
+import json
+import hashlib
+import notion_client
+import delivery_metrics
+
+INDEX_FILE = '.xref_index.json'
+
+# Candidate spec references: "TDC-SPEC-003", "TDC-SPEC-003.md", "specs/TDC-ARCH-001.md"
+TOKEN_RE = re.compile(r'[\w./-]+')
+
+def digest(value):
+    canonical = json.dumps(value, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+def spec_keys(specs):
+    """Map every way a spec can be referenced (ID, filename) to its ID."""
+    keys = {}
+    for spec in specs:
+        keys[spec["id"]] = spec["id"]
+        keys[spec.get("filename", spec["id"] + ".md")] = spec["id"]
+    return keys
+
+def find_refs(text, keys):
+    refs = set()
+    for token in TOKEN_RE.findall(text or ""):
+        token = token.rstrip('.').rsplit('/', 1)[-1]
+        if token in keys:
+            refs.add(keys[token])
+    return sorted(refs)
+
+def task_sources(tasks):
+    return {
+        f"task:{t['id']}": {"id": t["id"], "text": t["name"], "done": t["status"] == "Done"}
+        for t in tasks
+    }
+
+def issue_sources(issues):
+    return {
+        f"issue:{i['id']}": {
+            "id": i["id"],
+            "text": f"{i.get('title', '')}\n{i.get('description', '')}",
+            "open": delivery_metrics.issue_is_open(i)
+        }
+        for i in issues if i.get("id")
+    }
+
+def _link(specs, key, source, refs):
+    kind, item_id = key.split(':', 1)
+    flag = source["done"] if kind == "task" else source["open"]
+    for spec_id in refs:
+        spec = specs.setdefault(spec_id, {"tasks": {}, "issues": {}})
+        spec[f"{kind}s"][item_id] = flag
+
+def _unlink(specs, key, refs):
+    kind, item_id = key.split(':', 1)
+    for spec_id in refs:
+        spec = specs.get(spec_id)
+        if not spec:
+            continue
+        spec[f"{kind}s"].pop(item_id, None)
+        if not spec["tasks"] and not spec["issues"]:
+            del specs[spec_id]
+
+def update_index(index, specs, tasks, issues):
+    """
+    Re-scan only sources whose content changed since the index was saved.
+
+    `sources` keeps each task/issue's refs so its old entries can be removed;
+    `specs` is the persisted inverted index (spec ID -> tasks and issues).
+    """
+    keys = spec_keys(specs)
+    keys_digest = digest(keys)
+    if index.get("keys_digest") != keys_digest or "specs" not in index:
+        # The set of referenceable specs changed, so every source needs a re-scan
+        index = {"keys_digest": keys_digest, "sources": {}, "specs": {}}
+
+    previous = index["sources"]
+    inverted = index["specs"]
+    current = {**task_sources(tasks), **issue_sources(issues)}
+
+    for key in set(previous) - set(current):
+        _unlink(inverted, key, previous.pop(key)["refs"])
+
+    for key, source in current.items():
+        source_digest = digest(source)
+        cached = previous.get(key)
+        if cached and cached["digest"] == source_digest:
+            continue
+        if cached:
+            _unlink(inverted, key, cached["refs"])
+        refs = find_refs(source["text"], keys)
+        previous[key] = {"digest": source_digest, "refs": refs}
+        _link(inverted, key, source, refs)
+
+    return index
+
+def spec_links(index):
+    """Per-spec view of the inverted index with progress counts."""
+    return {
+        spec_id: {
+            "tasks": sorted(spec["tasks"]),
+            "issues": sorted(spec["issues"]),
+            "tasks_done": sum(spec["tasks"].values()),
+            "open_issues": sum(spec["issues"].values())
+        }
+        for spec_id, spec in index["specs"].items()
+    }
+
+def get_spec_links(specs, tasks, issues, persist=True):
+    """Load the persisted index, bring it up to date and return the per-spec view."""
+    with notion_client.cache_lock:
+        index = update_index(notion_client.load_cache(INDEX_FILE), specs, tasks, issues)
+        if persist:
+            notion_client.save_cache(index, INDEX_FILE)
+    return spec_links(index)